@@ -0,0 +1,99 @@
+"""
+HTTP caching helpers (ETag / Cache-Control) for read endpoints.
+"""
+import hashlib
+from typing import Awaitable, Callable, Optional
+from fastapi import HTTPException, Request, Response, Depends
+from app.services.cosmos_service import CosmosService
+from app.api.dependencies import get_cosmos_service
+from app.auth.swa_auth import get_user_id
+
+# Responses are per-user and must be revalidated, which is cheap thanks to the ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check whether an If-None-Match header value matches the given ETag."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def _apply_etag(
+    request: Request,
+    response: Response,
+    user_id: str,
+    get_version: Callable[[str], Awaitable[Optional[str]]]
+) -> None:
+    """
+    Set ETag and Cache-Control headers from a version marker.
+    
+    The ETag is derived from the version and the request URL, so each
+    endpoint and query string gets its own tag.
+    
+    Raises:
+        HTTPException: 304 Not Modified if the client's copy is current
+    """
+    try:
+        version = await get_version(user_id)
+    except RuntimeError:
+        # Serve the request without caching rather than failing it
+        return
+    
+    if version is None:
+        return
+    
+    key = f"{user_id}|{version}|{request.url.path}?{request.url.query}"
+    etag = f'W/"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+
+
+async def etag_cache(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
+) -> None:
+    """
+    Add ETag and Cache-Control headers, short-circuiting unchanged responses.
+    
+    The ETag follows the user's data version.
+    
+    Args:
+        request: FastAPI request object
+        response: Response whose headers are set
+        user_id: Authenticated user ID
+        
+    Raises:
+        HTTPException: 304 Not Modified if the client's copy is current
+    """
+    await _apply_etag(request, response, user_id, cosmos_service.get_data_version)
+
+
+async def dashboard_etag_cache(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
+) -> None:
+    """
+    Add ETag and Cache-Control headers to dashboard responses.
+    
+    Like etag_cache, but the ETag also changes when the month rolls over,
+    since the monthly total moves with the calendar.
+    
+    Args:
+        request: FastAPI request object
+        response: Response whose headers are set
+        user_id: Authenticated user ID
+        
+    Raises:
+        HTTPException: 304 Not Modified if the client's copy is current
+    """
+    await _apply_etag(request, response, user_id, cosmos_service.get_dashboard_version)
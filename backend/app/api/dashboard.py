@@ -1,16 +1,22 @@
 """
 Dashboard API endpoints for statistics and analytics.
 """
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
 from app.models.sales import DashboardStats, RecentSale
-from app.services.cosmos_service import cosmos_service
+from app.services.cosmos_service import CosmosService
+from app.api.dependencies import get_cosmos_service
 from app.auth.swa_auth import get_user_id
+from app.api.caching import etag_cache, dashboard_etag_cache
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
-@router.get("/stats", response_model=DashboardStats)
-async def get_dashboard_stats(user_id: str = Depends(get_user_id)):
+@router.get("/stats", response_model=DashboardStats, dependencies=[Depends(dashboard_etag_cache)])
+async def get_dashboard_stats(
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
+):
     """
     Get dashboard statistics for the authenticated user.
     
@@ -24,10 +30,11 @@ async def get_dashboard_stats(user_id: str = Depends(get_user_id)):
         raise HTTPException(status_code=500, detail=f"Failed to retrieve dashboard stats: {str(e)}")
 
 
-@router.get("/recent", response_model=list[RecentSale])
+@router.get("/recent", response_model=list[RecentSale], dependencies=[Depends(etag_cache)])
 async def get_recent_sales(
-    limit: int = 5,
-    user_id: str = Depends(get_user_id)
+    limit: int = Query(5, ge=1, le=20),
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
 ):
     """
     Get recent sales for the authenticated user.
@@ -39,9 +46,6 @@ async def get_recent_sales(
     Returns:
         List of recent sales
     """
-    # Limit the maximum number of recent sales
-    limit = min(limit, 20)
-    
     try:
         recent_sales = await cosmos_service.get_recent_sales(user_id, limit)
         return recent_sales
@@ -49,8 +53,11 @@ async def get_recent_sales(
         raise HTTPException(status_code=500, detail=f"Failed to retrieve recent sales: {str(e)}")
 
 
-@router.get("/", response_model=dict)
-async def get_dashboard_data(user_id: str = Depends(get_user_id)):
+@router.get("/", response_model=dict, dependencies=[Depends(dashboard_etag_cache)])
+async def get_dashboard_data(
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
+):
     """
     Get complete dashboard data including stats and recent sales.
     
@@ -59,8 +66,10 @@ async def get_dashboard_data(user_id: str = Depends(get_user_id)):
     """
     try:
         # Get both stats and recent sales in parallel
-        stats = await cosmos_service.get_dashboard_stats(user_id)
-        recent_sales = await cosmos_service.get_recent_sales(user_id, 5)
+        stats, recent_sales = await asyncio.gather(
+            cosmos_service.get_dashboard_stats(user_id),
+            cosmos_service.get_recent_sales(user_id, 5)
+        )
         
         return {
             "stats": stats,
@@ -0,0 +1,10 @@
+"""
+Shared FastAPI dependencies for the API routers.
+"""
+from fastapi import Request
+from app.services.cosmos_service import CosmosService
+
+
+def get_cosmos_service(request: Request) -> CosmosService:
+    """FastAPI dependency returning the service created by the app lifespan."""
+    return request.app.state.cosmos
@@ -4,14 +4,19 @@ Sales API endpoints for CRUD operations.
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
 from app.models.sales import SaleItem, SaleCreate, SaleUpdate
-from app.services.cosmos_service import cosmos_service
+from app.services.cosmos_service import CosmosService, BulkCreateError
+from app.api.dependencies import get_cosmos_service
 from app.auth.swa_auth import get_user_id
+from app.api.caching import etag_cache
 
 router = APIRouter(prefix="/api/sales", tags=["sales"])
 
 
-@router.get("/", response_model=List[SaleItem])
-async def get_sales(user_id: str = Depends(get_user_id)):
+@router.get("/", response_model=List[SaleItem], dependencies=[Depends(etag_cache)])
+async def get_sales(
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
+):
     """
     Get all sales for the authenticated user.
     
@@ -28,7 +33,8 @@ async def get_sales(user_id: str = Depends(get_user_id)):
 @router.post("/", response_model=SaleItem, status_code=201)
 async def create_sale(
     sale_data: SaleCreate,
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
 ):
     """
     Create a new sale.
@@ -49,10 +55,48 @@ async def create_sale(
         raise HTTPException(status_code=500, detail=f"Failed to create sale: {str(e)}")
 
 
+@router.post("/bulk", response_model=List[SaleItem], status_code=201)
+async def create_sales_bulk(
+    sales_data: List[SaleCreate],
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
+):
+    """
+    Create many sales in one request.
+    
+    Sales are created in order and creation stops at the first failure; the
+    error detail then lists the sales that were created, so a client can
+    retry only the remaining ones.
+    
+    Args:
+        sales_data: Sale creation data for each sale
+        user_id: Authenticated user ID
+        
+    Returns:
+        Created sale items
+    """
+    try:
+        sales = await cosmos_service.create_sales_bulk(user_id, sales_data)
+        return sales
+    except BulkCreateError as e:
+        raise HTTPException(
+            status_code=400 if e.client_error else 500,
+            detail={
+                "message": f"Failed to create sales: {str(e)}",
+                "created": [sale.model_dump() for sale in e.created]
+            }
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create sales: {str(e)}")
+
+
 @router.get("/{sale_id}", response_model=SaleItem)
 async def get_sale(
     sale_id: str,
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
 ):
     """
     Get a specific sale by ID.
@@ -74,7 +118,8 @@ async def get_sale(
 async def update_sale(
     sale_id: str,
     update_data: SaleUpdate,
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
 ):
     """
     Update a specific sale.
@@ -96,7 +141,8 @@ async def update_sale(
 @router.delete("/{sale_id}", status_code=204)
 async def delete_sale(
     sale_id: str,
-    user_id: str = Depends(get_user_id)
+    user_id: str = Depends(get_user_id),
+    cosmos_service: CosmosService = Depends(get_cosmos_service)
 ):
     """
     Delete a specific sale.
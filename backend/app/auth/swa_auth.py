@@ -3,19 +3,41 @@ Azure Static Web Apps authentication utilities.
 """
 from fastapi import HTTPException, Request, Depends
 from typing import Dict, Optional
-import json
 import base64
+from binascii import Error as BinasciiError
+import msgspec
 
 
-def get_current_user(request: Request) -> Dict:
+class ClientPrincipal(msgspec.Struct):
+    """Client principal sent by Azure Static Web Apps in x-ms-client-principal."""
+    userId: Optional[str] = None
+    userDetails: Optional[str] = None
+    identityProvider: Optional[str] = None
+    # Kept as undecoded JSON; parsed only when get_user_claims needs it
+    claims: msgspec.Raw = msgspec.Raw(b"[]")
+
+
+class _UserIdPrincipal(msgspec.Struct):
+    """Client principal reduced to the user ID; all other fields are skipped."""
+    userId: Optional[str] = None
+
+
+# Reused decoders: each schema is compiled once, not per request
+_PRINCIPAL_DECODER = msgspec.json.Decoder(ClientPrincipal)
+_USER_ID_DECODER = msgspec.json.Decoder(_UserIdPrincipal)
+_CLAIMS_DECODER = msgspec.json.Decoder(list)
+
+
+def _decode_client_principal(request: Request, decoder: msgspec.json.Decoder):
     """
-    Extract user information from Azure Static Web Apps headers.
+    Decode the x-ms-client-principal header with the given decoder.
     
     Args:
         request: FastAPI request object
+        decoder: Decoder for the principal fields the caller needs
         
     Returns:
-        Dict containing user information
+        Decoded principal with a non-empty userId
         
     Raises:
         HTTPException: If user is not authenticated
@@ -30,47 +52,83 @@ def get_current_user(request: Request) -> Dict:
         )
     
     try:
-        # Decode the base64 encoded client principal
-        decoded_bytes = base64.b64decode(client_principal_header)
-        client_principal = json.loads(decoded_bytes)
-        
-        # Extract user information
-        user_id = client_principal.get('userId')
-        user_details = client_principal.get('userDetails')
-        provider = client_principal.get('identityProvider')
-        
-        if not user_id:
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid authentication. User ID not found."
-            )
-        
-        return {
-            "userId": user_id,
-            "userDetails": user_details or "Unknown User",
-            "provider": provider or "unknown",
-            "claims": client_principal.get('claims', [])
-        }
-        
-    except (json.JSONDecodeError, ValueError) as e:
+        # Decode the base64 encoded client principal, rejecting non-alphabet characters
+        decoded_bytes = base64.b64decode(client_principal_header, validate=True)
+        client_principal = decoder.decode(decoded_bytes)
+    except (msgspec.DecodeError, BinasciiError, ValueError) as e:
         raise HTTPException(
             status_code=401,
             detail=f"Invalid authentication data: {str(e)}"
         )
+    
+    if not client_principal.userId:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid authentication. User ID not found."
+        )
+    
+    return client_principal
+
+
+def get_current_user(request: Request) -> Dict:
+    """
+    Extract user information from Azure Static Web Apps headers.
+    
+    The decoded principal is cached on request.state, so repeated calls
+    within one request decode the header only once. Claims are not included;
+    use get_user_claims, which parses them on demand.
+    
+    Args:
+        request: FastAPI request object
+        
+    Returns:
+        Dict containing user information
+        
+    Raises:
+        HTTPException: If user is not authenticated
+    """
+    cached_user = getattr(request.state, 'swa_principal', None)
+    if cached_user is not None:
+        return cached_user
+    
+    client_principal = _decode_client_principal(request, _PRINCIPAL_DECODER)
+    
+    # Extract user information
+    user = {
+        "userId": client_principal.userId,
+        "userDetails": client_principal.userDetails or "Unknown User",
+        "provider": client_principal.identityProvider or "unknown"
+    }
+    request.state.swa_principal = user
+    request.state.swa_claims_raw = client_principal.claims
+    return user
 
 
 def get_user_id(request: Request) -> str:
     """
     Get just the user ID from the request.
     
+    Only the userId field is decoded unless the full principal has already
+    been parsed for this request.
+    
     Args:
         request: FastAPI request object
         
     Returns:
         User ID string
+        
+    Raises:
+        HTTPException: If user is not authenticated
     """
-    user = get_current_user(request)
-    return user["userId"]
+    cached_user = getattr(request.state, 'swa_principal', None)
+    if cached_user is not None:
+        return cached_user["userId"]
+    
+    user_id = getattr(request.state, 'swa_user_id', None)
+    if user_id is None:
+        user_id = _decode_client_principal(request, _USER_ID_DECODER).userId
+        request.state.swa_user_id = user_id
+    return user_id
 
 
 def get_user_claims(request: Request) -> list:
@@ -82,9 +140,22 @@ def get_user_claims(request: Request) -> list:
         
     Returns:
         List of user claims
+        
+    Raises:
+        HTTPException: If user is not authenticated
     """
-    user = get_current_user(request)
-    return user.get("claims", [])
+    claims = getattr(request.state, 'swa_claims', None)
+    if claims is None:
+        get_current_user(request)
+        try:
+            claims = _CLAIMS_DECODER.decode(request.state.swa_claims_raw)
+        except msgspec.DecodeError as e:
+            raise HTTPException(
+                status_code=401,
+                detail=f"Invalid authentication data: {str(e)}"
+            )
+        request.state.swa_claims = claims
+    return claims
 
 
 def is_authenticated(request: Request) -> bool:
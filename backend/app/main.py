@@ -1,24 +1,41 @@
 """
 FastAPI main application for Sale Tracker API.
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from brotli_asgi import BrotliMiddleware
+from fastapi.responses import ORJSONResponse, Response
 import os
 from dotenv import load_dotenv
 from app.api import sales, dashboard
 from app.auth.swa_auth import get_current_user
+from app.services.cosmos_service import CosmosService
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the Cosmos DB service on startup and close it on shutdown."""
+    app.state.cosmos = CosmosService()
+    await app.state.cosmos.start()
+    try:
+        yield
+    finally:
+        await app.state.cosmos.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Sale Tracker API",
     description="Backend API for sales tracking application with Azure Cosmos DB",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -36,6 +53,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses (brotli, falling back to gzip); small bodies aren't worth it
+app.add_middleware(BrotliMiddleware, quality=4, minimum_size=512)
+
 # Include API routers
 app.include_router(sales.router)
 app.include_router(dashboard.router)
@@ -71,7 +91,10 @@ async def get_user_info(user: dict = Depends(get_current_user)):
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler."""
-    return JSONResponse(
+    if exc.status_code == 304:
+        # Not Modified responses must not carry a body
+        return Response(status_code=304, headers=exc.headers)
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail, "status_code": exc.status_code}
     )
@@ -80,7 +103,7 @@ async def http_exception_handler(request, exc):
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """General exception handler."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "status_code": 500}
     )
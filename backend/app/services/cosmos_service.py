@@ -1,37 +1,107 @@
 """
 Azure Cosmos DB service for sales data operations.
 """
+import asyncio
 import os
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
-from azure.cosmos import CosmosClient, PartitionKey, exceptions
-from azure.identity import DefaultAzureCredential
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Tuple
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+from azure.cosmos.aio import CosmosClient
+from azure.identity.aio import DefaultAzureCredential
 from dotenv import load_dotenv
+from pydantic import TypeAdapter
 from app.models.sales import SaleItem, SaleCreate, SaleUpdate, DashboardStats, RecentSale
 
 # Load environment variables
 load_dotenv()
 
+# How long a user's data version is reused before Cosmos DB is queried again
+DATA_VERSION_TTL_SECONDS = 5
+# Upper bound on how long dashboard query results are served from memory;
+# entries are also dropped as soon as the user's data version changes
+RESULT_CACHE_TTL_SECONDS = 30
+# Maximum number of users whose cached data is kept in memory
+USER_CACHE_SIZE = 1024
+
+# Validators built once at import and reused; the list adapter validates a
+# whole (small) query result in one pass instead of per item
+_SALE_ADAPTER = TypeAdapter(SaleItem)
+_RECENT_LIST_ADAPTER = TypeAdapter(List[RecentSale])
+
+# Composite index serving "WHERE c.userId = @userId ORDER BY c.saleDate DESC"
+# without an in-memory sort. Single-path range indexes (including /saleDate)
+# come from the default "/*" included path.
+SALES_COMPOSITE_INDEX = [
+    {"path": "/userId", "order": "ascending"},
+    {"path": "/saleDate", "order": "descending"}
+]
+
+# Cosmos DB transactional batches are limited to 100 operations
+BATCH_SIZE_LIMIT = 100
+# Upper bound on sales per bulk create request
+MAX_BULK_SALES = 1000
+
+# Per-user dashboard snapshot document, stored in the user's partition.
+# Sale documents have no "type" field, which is how queries exclude it.
+SNAPSHOT_ID = "dashboard-snapshot"
+SNAPSHOT_TYPE = "snapshot"
+# Snapshots are rebuilt from the sales after this long to correct any drift
+SNAPSHOT_MAX_AGE_SECONDS = 3600
+
+
+def utc_month() -> str:
+    """Return the current UTC month as "YYYY-MM", the prefix of sale dates in that month."""
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+class BulkCreateError(Exception):
+    """
+    A bulk create stopped at a failed batch.
+    
+    Attributes:
+        created: Sales created before the failure, in request order
+        client_error: Whether the batch was rejected because of its content
+            (invalid or conflicting documents) rather than a service failure
+    """
+    
+    def __init__(self, message: str, created: List[SaleItem], client_error: bool):
+        super().__init__(message)
+        self.created = created
+        self.client_error = client_error
+
 
 class CosmosService:
     """Service class for Cosmos DB operations."""
     
     def __init__(self):
-        """Initialize Cosmos DB client."""
+        """Read Cosmos DB configuration; the client is created by start()."""
         self.database_name = "sales-database"
         self.container_name = "sales"
         self.client = None
         self.database = None
         self.container = None
+        self._credential = None
+        self._data_versions = OrderedDict()
+        self._result_cache = OrderedDict()
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
         
         # Prefer explicit connection string for local/dev; otherwise use managed identity with endpoint
-        connection_string = os.environ.get('COSMOSDB_CONNECTION_STRING')
-        cosmos_endpoint = os.environ.get('COSMOSDB_ENDPOINT')
+        self._connection_string = os.environ.get('COSMOSDB_CONNECTION_STRING')
+        self._cosmos_endpoint = os.environ.get('COSMOSDB_ENDPOINT')
 
-        if connection_string:
+        if not self._connection_string and not self._cosmos_endpoint:
+            raise ValueError("Set COSMOSDB_CONNECTION_STRING (local) or COSMOSDB_ENDPOINT (managed identity)")
+    
+    async def start(self) -> None:
+        """Initialize the async Cosmos DB client and warm its connection. Called from the app lifespan."""
+        if self._connection_string:
             # Local development with connection string
             # Check if connection string is a placeholder
+            connection_string = self._connection_string
             if "your-cosmosdb-account" in connection_string or "your-primary-key" in connection_string:
                 print("WARNING: Using placeholder Cosmos DB connection string. Please update .env file with real values.")
                 return
@@ -42,17 +112,48 @@ class CosmosService:
                 print(f"WARNING: Failed to connect to Cosmos DB: {e}")
                 print("Please check your COSMOSDB_CONNECTION_STRING in .env file")
                 return
-        elif cosmos_endpoint:
-            # Production with managed identity
-            credential = DefaultAzureCredential()
-            self.client = CosmosClient(url=cosmos_endpoint, credential=credential)
         else:
-            raise ValueError("Set COSMOSDB_CONNECTION_STRING (local) or COSMOSDB_ENDPOINT (managed identity)")
+            # Production with managed identity
+            self._credential = DefaultAzureCredential()
+            self.client = CosmosClient(url=self._cosmos_endpoint, credential=self._credential)
         
         # Get database and container references
+        self.database = self.client.get_database_client(self.database_name)
+        self.container = self.database.get_container_client(self.container_name)
+        
+        # Reading the container properties also primes the connection, so the
+        # first user request doesn't pay for DNS/TLS setup
+        try:
+            await self._check_indexing_policy()
+        except Exception as e:
+            print(f"WARNING: Failed to verify Cosmos DB container '{self.container_name}': {e}")
+    
+    async def _check_indexing_policy(self) -> None:
+        """
+        Warn if the container is missing the sales composite index.
+        
+        The index is part of the container setup (see SETUP.md); the app
+        doesn't change the container itself, since replacing it would drop
+        properties such as TTL settings and every replica would race to do it.
+        """
+        properties = await self.container.read()
+        composite_indexes = properties.get('indexingPolicy', {}).get('compositeIndexes', [])
+        if SALES_COMPOSITE_INDEX not in composite_indexes:
+            print(
+                f"WARNING: Cosmos DB container '{self.container_name}' has no composite index on "
+                "(/userId ascending, /saleDate descending); sales listings will be slower and cost more RUs"
+            )
+    
+    async def close(self) -> None:
+        """Close the Cosmos DB client and credential. Called on app shutdown."""
         if self.client:
-            self.database = self.client.get_database_client(self.database_name)
-            self.container = self.database.get_container_client(self.container_name)
+            await self.client.close()
+        if self._credential:
+            await self._credential.close()
+        self.client = None
+        self.database = None
+        self.container = None
+        self._credential = None
     
     async def create_sale(self, user_id: str, sale_data: SaleCreate) -> SaleItem:
         """
@@ -83,31 +184,102 @@ class CosmosService:
                 updatedAt=now
             )
         
-        now = datetime.now(timezone.utc).isoformat()
-        sale_id = str(uuid.uuid4())
-        
-        sale_item = SaleItem(
-            id=sale_id,
-            userId=user_id,
-            productName=sale_data.productName,
-            amount=sale_data.amount,
-            saleDate=sale_data.saleDate,
-            customerName=sale_data.customerName,
-            platform=sale_data.platform,
-            createdAt=now,
-            updatedAt=now
-        )
+        sale_dict = self._build_sale_document(user_id, sale_data, datetime.now(timezone.utc).isoformat())
         
         try:
-            # Convert to dict for Cosmos DB
-            sale_dict = sale_item.model_dump()
-            created_item = self.container.create_item(sale_dict)
-            return SaleItem(**created_item)
+            await self._write_with_snapshot_delta(
+                user_id,
+                self.container.create_item(sale_dict),
+                amount=sale_data.amount,
+                items=1,
+                this_month=self._amount_in_month(sale_data.amount, sale_data.saleDate)
+            )
+            self._invalidate_user_cache(user_id)
+            # The stored document only differs by Cosmos DB system properties
+            return SaleItem.model_construct(**sale_dict)
         except exceptions.CosmosResourceExistsError:
             raise ValueError("Sale with this ID already exists")
         except Exception as e:
             raise RuntimeError(f"Failed to create sale: {str(e)}")
     
+    async def create_sales_bulk(self, user_id: str, sales_data: List[SaleCreate]) -> List[SaleItem]:
+        """
+        Create many sale items using transactional batches.
+        
+        Sales are written in order, in batches of up to BATCH_SIZE_LIMIT. Each
+        batch succeeds or fails as a whole, and writing stops at the first
+        failed batch so the sales created so far are always a prefix of the
+        request.
+        
+        Args:
+            user_id: User ID (partition key)
+            sales_data: Sale creation data for each sale
+            
+        Returns:
+            Created sale items, in request order
+            
+        Raises:
+            ValueError: If more than MAX_BULK_SALES sales are given
+            BulkCreateError: If a batch fails; carries the sales already created
+        """
+        if len(sales_data) > MAX_BULK_SALES:
+            raise ValueError(f"Cannot create more than {MAX_BULK_SALES} sales per request")
+        
+        now = datetime.now(timezone.utc).isoformat()
+        sale_dicts = [self._build_sale_document(user_id, sale_data, now) for sale_data in sales_data]
+        
+        if not self.client:
+            # For local development, return mock sale items
+            print("WARNING: Cosmos DB not available, returning mock sales for development")
+            return [SaleItem.model_construct(**sale_dict) for sale_dict in sale_dicts]
+        
+        created: List[Dict[str, Any]] = []
+        error: Optional[Exception] = None
+        for start in range(0, len(sale_dicts), BATCH_SIZE_LIMIT):
+            chunk = sale_dicts[start:start + BATCH_SIZE_LIMIT]
+            try:
+                await self.container.execute_item_batch(
+                    batch_operations=[("create", (sale_dict,)) for sale_dict in chunk],
+                    partition_key=user_id
+                )
+            except Exception as e:
+                error = e
+                break
+            created.extend(chunk)
+        
+        if created:
+            await self._apply_snapshot_delta(
+                user_id,
+                amount=sum(sale_dict["amount"] for sale_dict in created),
+                items=len(created),
+                this_month=sum(
+                    self._amount_in_month(sale_dict["amount"], sale_dict["saleDate"])
+                    for sale_dict in created
+                )
+            )
+            self._invalidate_user_cache(user_id)
+        
+        created_items = [SaleItem.model_construct(**sale_dict) for sale_dict in created]
+        if error is not None:
+            raise BulkCreateError(
+                f"Created {len(created)} of {len(sale_dicts)} sales: {str(error)}",
+                created=created_items,
+                client_error=getattr(error, "status_code", None) in (400, 409)
+            )
+        
+        return created_items
+    
+    @staticmethod
+    def _build_sale_document(user_id: str, sale_data: SaleCreate, now: str) -> Dict[str, Any]:
+        """Build the Cosmos DB document for a new sale; sale_data is already validated."""
+        return {
+            "id": str(uuid.uuid4()),
+            "userId": user_id,
+            **sale_data.model_dump(),
+            "createdAt": now,
+            "updatedAt": now
+        }
+    
     async def get_sale(self, user_id: str, sale_id: str) -> Optional[SaleItem]:
         """
         Get a specific sale by ID.
@@ -122,12 +294,15 @@ class CosmosService:
         if not self.client:
             raise RuntimeError("Cosmos DB client not initialized. Please check your connection string.")
         
+        if sale_id == SNAPSHOT_ID:
+            return None
+        
         try:
-            item = self.container.read_item(
+            item = await self.container.read_item(
                 item=sale_id,
                 partition_key=user_id
             )
-            return SaleItem(**item)
+            return _SALE_ADAPTER.validate_python(item)
         except exceptions.CosmosResourceNotFoundError:
             return None
         except Exception as e:
@@ -150,17 +325,28 @@ class CosmosService:
             return []
         
         try:
-            query = "SELECT * FROM c WHERE c.userId = @userId ORDER BY c.saleDate DESC"
+            # Project the SaleItem fields only, leaving out Cosmos system properties
+            query = """
+                SELECT c.id, c.userId, c.productName, c.amount, c.saleDate, c.customerName,
+                    c.platform, c.createdAt, c.updatedAt
+                FROM c
+                WHERE c.userId = @userId AND NOT IS_DEFINED(c.type)
+                ORDER BY c.saleDate DESC
+            """
             parameters = [{"name": "@userId", "value": user_id}]
             
-            items = list(self.container.query_items(
+            # Validate each item as its page arrives rather than holding every
+            # raw document and every model in memory at once
+            sales = []
+            async for item in self.container.query_items(
                 query=query,
                 parameters=parameters,
-                enable_cross_partition_query=False,
+                partition_key=user_id,
                 max_item_count=limit
-            ))
+            ):
+                sales.append(_SALE_ADAPTER.validate_python(item))
             
-            return [SaleItem(**item) for item in items]
+            return sales
         except Exception as e:
             raise RuntimeError(f"Failed to get sales: {str(e)}")
     
@@ -179,27 +365,32 @@ class CosmosService:
         if not self.client:
             raise RuntimeError("Cosmos DB client not initialized. Please check your connection string.")
         
+        if sale_id == SNAPSHOT_ID:
+            return None
+        
         try:
-            # Get existing item
-            existing_item = await self.get_sale(user_id, sale_id)
-            if not existing_item:
-                return None
-            
             # Update fields
             update_dict = update_data.model_dump(exclude_unset=True)
             update_dict['updatedAt'] = datetime.now(timezone.utc).isoformat()
             
-            # Merge with existing data
-            updated_data = existing_item.model_dump()
-            updated_data.update(update_dict)
-            
-            # Update in Cosmos DB
-            updated_item = self.container.replace_item(
+            # Patch only the changed paths in a single round trip
+            operations = [
+                {"op": "set", "path": f"/{field}", "value": value}
+                for field, value in update_dict.items()
+            ]
+            updated_item = await self.container.patch_item(
                 item=sale_id,
-                body=updated_data
+                partition_key=user_id,
+                patch_operations=operations
             )
             
-            return SaleItem(**updated_item)
+            # The previous amount and date aren't known without a read, so
+            # have the snapshot rebuilt rather than applying a delta
+            if 'amount' in update_dict or 'saleDate' in update_dict:
+                await self._discard_snapshot(user_id)
+            self._invalidate_user_cache(user_id)
+            
+            return _SALE_ADAPTER.validate_python(updated_item)
         except exceptions.CosmosResourceNotFoundError:
             return None
         except Exception as e:
@@ -220,10 +411,22 @@ class CosmosService:
             raise RuntimeError("Cosmos DB client not initialized. Please check your connection string.")
         
         try:
-            self.container.delete_item(
-                item=sale_id,
-                partition_key=user_id
+            # Read first so the snapshot can be decremented by the sale's amount
+            existing_item = await self.get_sale(user_id, sale_id)
+            if not existing_item:
+                return False
+            
+            await self._write_with_snapshot_delta(
+                user_id,
+                self.container.delete_item(
+                    item=sale_id,
+                    partition_key=user_id
+                ),
+                amount=-existing_item.amount,
+                items=-1,
+                this_month=-self._amount_in_month(existing_item.amount, existing_item.saleDate)
             )
+            self._invalidate_user_cache(user_id)
             return True
         except exceptions.CosmosResourceNotFoundError:
             return False
@@ -250,76 +453,160 @@ class CosmosService:
                 avgPrice=0.0
             )
         
-        try:
-            # Get current month for filtering
-            now = datetime.now(timezone.utc)
-            current_month = now.strftime("%Y-%m")
-            
-            # Use separate queries for each aggregate to avoid composition issues
-            # Get total sales
-            total_sales_query = """
-                SELECT VALUE SUM(c.amount)
-                FROM c 
-                WHERE c.userId = @userId
-            """
-            
-            # Get total items
-            total_items_query = """
-                SELECT VALUE COUNT(1)
-                FROM c 
-                WHERE c.userId = @userId
-            """
+        # thisMonth depends on the month as well as the data
+        return await self._get_cached(
+            user_id, f"stats:{utc_month()}", lambda: self._load_dashboard_stats(user_id)
+        )
+    
+    async def _load_dashboard_stats(self, user_id: str) -> DashboardStats:
+        """
+        Load dashboard statistics from the user's snapshot document.
+        
+        The snapshot is rebuilt with a full aggregate query when it is missing,
+        belongs to a previous month, or is older than SNAPSHOT_MAX_AGE_SECONDS.
+        The rebuilt totals are only saved if no sale write touched the snapshot
+        while the query ran; otherwise they are returned but not stored.
+        
+        Args:
+            user_id: User ID (partition key)
             
-            # Get average price
-            avg_price_query = """
-                SELECT VALUE AVG(c.amount)
-                FROM c 
-                WHERE c.userId = @userId
-            """
+        Returns:
+            Dashboard statistics
+        """
+        current_month = utc_month()
+        
+        try:
+            snapshot = await self.container.read_item(item=SNAPSHOT_ID, partition_key=user_id)
+        except exceptions.CosmosResourceNotFoundError:
+            snapshot = None
+        except Exception as e:
+            raise RuntimeError(f"Failed to get dashboard stats: {str(e)}")
+        
+        if (
+            snapshot
+            and not snapshot.get('pending')
+            and snapshot.get('month') == current_month
+            and time.time() - snapshot.get('rebuiltAt', 0) < SNAPSHOT_MAX_AGE_SECONDS
+        ):
+            total_sales = snapshot.get('totalSales', 0) or 0
+            total_items = snapshot.get('totalItems', 0) or 0
+            return DashboardStats(
+                totalSales=float(total_sales),
+                totalItems=int(total_items),
+                thisMonth=float(snapshot.get('thisMonth', 0) or 0),
+                avgPrice=float(total_sales / total_items) if total_items else 0.0
+            )
+        
+        if snapshot is None:
+            # Sale writes only patch an existing snapshot, so create a pending
+            # placeholder first: writes during the aggregate query then change
+            # its ETag and the conditional save below is skipped
+            snapshot = await self._create_pending_snapshot(user_id, current_month)
+        
+        stats = await self._query_dashboard_stats(user_id, current_month)
+        
+        if snapshot is None:
+            return stats
+        
+        try:
+            await self.container.replace_item(
+                item=SNAPSHOT_ID,
+                body=self._snapshot_document(user_id, current_month, stats),
+                etag=snapshot['_etag'],
+                match_condition=MatchConditions.IfNotModified
+            )
+        except (exceptions.CosmosAccessConditionFailedError, exceptions.CosmosResourceNotFoundError):
+            # A sale write changed or discarded the snapshot during the query;
+            # these totals may be stale, so leave the rebuild to the next load
+            pass
+        except Exception as e:
+            print(f"WARNING: Failed to save dashboard snapshot: {e}")
+        
+        return stats
+    
+    async def _create_pending_snapshot(self, user_id: str, current_month: str) -> Optional[Dict[str, Any]]:
+        """
+        Create a placeholder snapshot to be filled in by a rebuild.
+        
+        Args:
+            user_id: User ID (partition key)
+            current_month: Month the snapshot covers, as "YYYY-MM"
             
-            # Get this month's sales
-            this_month_query = """
-                SELECT VALUE SUM(c.amount)
-                FROM c 
-                WHERE c.userId = @userId AND STARTSWITH(c.saleDate, @currentMonth)
+        Returns:
+            The snapshot document now stored, or None if it couldn't be created or read
+        """
+        placeholder = self._snapshot_document(
+            user_id,
+            current_month,
+            DashboardStats(totalSales=0.0, totalItems=0, thisMonth=0.0, avgPrice=0.0)
+        )
+        placeholder['pending'] = True
+        
+        try:
+            return await self.container.create_item(placeholder)
+        except exceptions.CosmosResourceExistsError:
+            # Another load created it first; rebuild against that one
+            try:
+                return await self.container.read_item(item=SNAPSHOT_ID, partition_key=user_id)
+            except Exception:
+                return None
+        except Exception as e:
+            print(f"WARNING: Failed to create dashboard snapshot: {e}")
+            return None
+    
+    @staticmethod
+    def _snapshot_document(user_id: str, current_month: str, stats: DashboardStats) -> Dict[str, Any]:
+        """Build the dashboard snapshot document for the given statistics."""
+        return {
+            "id": SNAPSHOT_ID,
+            "userId": user_id,
+            "type": SNAPSHOT_TYPE,
+            "month": current_month,
+            "totalSales": stats.totalSales,
+            "totalItems": stats.totalItems,
+            "thisMonth": stats.thisMonth,
+            "rebuiltAt": time.time(),
+            "lastUpdatedAt": datetime.now(timezone.utc).isoformat()
+        }
+    
+    async def _query_dashboard_stats(self, user_id: str, current_month: str) -> DashboardStats:
+        """Compute dashboard statistics with an aggregate query over the user's sales."""
+        # Bounds for the month as "YYYY-MM" strings, so both date-only and
+        # full ISO timestamps in saleDate compare correctly
+        year, month = (int(part) for part in current_month.split("-"))
+        next_month = f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+        
+        try:
+            # Single-partition aggregate query: one round trip and one scan of
+            # the user's partition for all four statistics
+            stats_query = """
+                SELECT
+                    SUM(c.amount) AS totalSales,
+                    COUNT(1) AS totalItems,
+                    AVG(c.amount) AS avgPrice,
+                    SUM(IIF(c.saleDate >= @monthStart AND c.saleDate < @monthEnd, c.amount, 0)) AS thisMonth
+                FROM c
+                WHERE c.userId = @userId AND NOT IS_DEFINED(c.type)
             """
             
-            parameters = [{"name": "@userId", "value": user_id}]
-            this_month_parameters = [
+            parameters = [
                 {"name": "@userId", "value": user_id},
-                {"name": "@currentMonth", "value": current_month}
+                {"name": "@monthStart", "value": current_month},
+                {"name": "@monthEnd", "value": next_month}
             ]
             
-            # Execute all queries
-            total_sales_result = list(self.container.query_items(
-                query=total_sales_query,
-                parameters=parameters,
-                enable_cross_partition_query=True
-            ))
-            
-            total_items_result = list(self.container.query_items(
-                query=total_items_query,
-                parameters=parameters,
-                enable_cross_partition_query=True
-            ))
-            
-            avg_price_result = list(self.container.query_items(
-                query=avg_price_query,
+            result = [item async for item in self.container.query_items(
+                query=stats_query,
                 parameters=parameters,
-                enable_cross_partition_query=True
-            ))
-            
-            this_month_result = list(self.container.query_items(
-                query=this_month_query,
-                parameters=this_month_parameters,
-                enable_cross_partition_query=True
-            ))
+                partition_key=user_id
+            )]
             
-            # Extract values from results with proper null handling
-            total_sales = total_sales_result[0] if total_sales_result and len(total_sales_result) > 0 and total_sales_result[0] is not None else 0
-            total_items = total_items_result[0] if total_items_result and len(total_items_result) > 0 and total_items_result[0] is not None else 0
-            avg_price = avg_price_result[0] if avg_price_result and len(avg_price_result) > 0 and avg_price_result[0] is not None else 0
-            this_month_sales = this_month_result[0] if this_month_result and len(this_month_result) > 0 and this_month_result[0] is not None else 0
+            # Extract values from result with proper null handling
+            row = result[0] if result else {}
+            total_sales = row.get('totalSales', 0) or 0
+            total_items = row.get('totalItems', 0) or 0
+            avg_price = row.get('avgPrice', 0) or 0
+            this_month_sales = row.get('thisMonth', 0) or 0
             
             return DashboardStats(
                 totalSales=float(total_sales),
@@ -346,27 +633,280 @@ class CosmosService:
             print("WARNING: Cosmos DB not available, returning empty recent sales for development")
             return []
         
+        return await self._get_cached(
+            user_id, f"recent:{limit}", lambda: self._query_recent_sales(user_id, limit)
+        )
+    
+    async def _query_recent_sales(self, user_id: str, limit: int) -> List[RecentSale]:
+        """Run the recent sales query against Cosmos DB."""
         try:
             query = """
-                SELECT c.id, c.productName, c.amount, c.saleDate, c.platform, c.customerName
+                SELECT TOP @limit c.id, c.productName, c.amount, c.saleDate, c.platform, c.customerName
                 FROM c 
-                WHERE c.userId = @userId
+                WHERE c.userId = @userId AND NOT IS_DEFINED(c.type)
                 ORDER BY c.saleDate DESC
             """
             
-            parameters = [{"name": "@userId", "value": user_id}]
+            parameters = [
+                {"name": "@userId", "value": user_id},
+                {"name": "@limit", "value": limit}
+            ]
             
-            items = list(self.container.query_items(
+            items = [item async for item in self.container.query_items(
                 query=query,
                 parameters=parameters,
-                enable_cross_partition_query=False,
+                partition_key=user_id,
                 max_item_count=limit
-            ))
+            )]
             
-            return [RecentSale(**item) for item in items]
+            return _RECENT_LIST_ADAPTER.validate_python(items)
         except Exception as e:
             raise RuntimeError(f"Failed to get recent sales: {str(e)}")
-
-
-# Global service instance
-cosmos_service = CosmosService()
+    
+    async def get_data_version(self, user_id: str) -> Optional[str]:
+        """
+        Get a cheap version marker for a user's sales data.
+        
+        The marker changes whenever one of the user's sales is created, updated
+        or deleted, or their dashboard snapshot is rebuilt, and is used to build
+        ETags. It is cached in memory for a few seconds so that repeated polls
+        do not query Cosmos DB.
+        
+        Args:
+            user_id: User ID (partition key)
+            
+        Returns:
+            Version string, or None if Cosmos DB is not available
+        """
+        if not self.client:
+            return None
+        
+        now = time.monotonic()
+        cached = self._data_versions.get(user_id)
+        if cached and now - cached[1] < DATA_VERSION_TTL_SECONDS:
+            self._data_versions.move_to_end(user_id)
+            return cached[0]
+        
+        async def query_sales_version() -> Dict[str, Any]:
+            query = """
+                SELECT MAX(c.updatedAt) AS lastUpdated, COUNT(1) AS itemCount
+                FROM c
+                WHERE c.userId = @userId AND NOT IS_DEFINED(c.type)
+            """
+            
+            parameters = [{"name": "@userId", "value": user_id}]
+            
+            result = [item async for item in self.container.query_items(
+                query=query,
+                parameters=parameters,
+                partition_key=user_id
+            )]
+            return result[0] if result else {}
+        
+        try:
+            row, snapshot_etag = await asyncio.gather(
+                query_sales_version(),
+                self._get_snapshot_etag(user_id)
+            )
+            version = f"{row.get('itemCount', 0) or 0}:{row.get('lastUpdated') or ''}:{snapshot_etag}"
+        except Exception as e:
+            raise RuntimeError(f"Failed to get data version: {str(e)}")
+        
+        self._data_versions[user_id] = (version, now)
+        self._data_versions.move_to_end(user_id)
+        if len(self._data_versions) > USER_CACHE_SIZE:
+            self._data_versions.popitem(last=False)
+        
+        return version
+    
+    async def get_dashboard_version(self, user_id: str) -> Optional[str]:
+        """
+        Get a version marker for a user's dashboard responses.
+        
+        Extends the data version with the current month, since thisMonth
+        changes when the month rolls over even if no sale does.
+        
+        Args:
+            user_id: User ID (partition key)
+            
+        Returns:
+            Version string, or None if Cosmos DB is not available
+        """
+        version = await self.get_data_version(user_id)
+        if version is None:
+            return None
+        return f"{utc_month()}|{version}"
+    
+    async def _get_snapshot_etag(self, user_id: str) -> str:
+        """Return the ETag of the user's dashboard snapshot, or "" if there is none."""
+        try:
+            snapshot = await self.container.read_item(item=SNAPSHOT_ID, partition_key=user_id)
+        except exceptions.CosmosResourceNotFoundError:
+            return ""
+        return snapshot["_etag"]
+    
+    @staticmethod
+    def _amount_in_month(amount: float, sale_date: str) -> float:
+        """Return the amount if the sale date falls in the current month, else 0."""
+        current_month = utc_month()
+        return amount if sale_date.startswith(current_month) else 0.0
+    
+    async def _apply_snapshot_delta(self, user_id: str, amount: float, items: int, this_month: float) -> bool:
+        """
+        Apply a sale write to the user's dashboard snapshot.
+        
+        Uses a partial document update with increments, so concurrent writes
+        don't race. Failures never fail the sale write: a missing snapshot is
+        built on the next load, and a snapshot for another month or one that
+        could not be patched is deleted so it gets rebuilt.
+        
+        Args:
+            user_id: User ID (partition key)
+            amount: Change in total sales amount
+            items: Change in number of sales
+            this_month: Change in the current month's sales amount
+            
+        Returns:
+            True if the snapshot was patched, False otherwise
+        """
+        current_month = utc_month()
+        operations = [
+            {"op": "incr", "path": "/totalSales", "value": amount},
+            {"op": "incr", "path": "/totalItems", "value": items},
+            {"op": "incr", "path": "/thisMonth", "value": this_month},
+            {"op": "set", "path": "/lastUpdatedAt", "value": datetime.now(timezone.utc).isoformat()}
+        ]
+        
+        try:
+            await self.container.patch_item(
+                item=SNAPSHOT_ID,
+                partition_key=user_id,
+                patch_operations=operations,
+                filter_predicate=f"FROM c WHERE c.month = '{current_month}'"
+            )
+        except exceptions.CosmosResourceNotFoundError:
+            return False
+        except Exception as e:
+            print(f"WARNING: Failed to update dashboard snapshot, discarding it: {e}")
+            await self._discard_snapshot(user_id)
+            return False
+        return True
+    
+    async def _write_with_snapshot_delta(
+        self,
+        user_id: str,
+        write: Awaitable[Any],
+        amount: float,
+        items: int,
+        this_month: float
+    ) -> Any:
+        """
+        Run a sale write and its snapshot update concurrently.
+        
+        If the write fails after the snapshot update applied, the snapshot is
+        discarded so the next load rebuilds it, and the write's error is
+        raised. Applying the opposite delta instead isn't safe: a rebuild that
+        ran in between already excludes the failed sale.
+        
+        Args:
+            user_id: User ID (partition key)
+            write: Pending Cosmos DB write for the sale
+            amount: Change in total sales amount
+            items: Change in number of sales
+            this_month: Change in the current month's sales amount
+            
+        Returns:
+            Result of the write
+        """
+        result, applied = await asyncio.gather(
+            write,
+            self._apply_snapshot_delta(user_id, amount=amount, items=items, this_month=this_month),
+            return_exceptions=True
+        )
+        
+        if isinstance(result, BaseException):
+            if applied is True:
+                await self._discard_snapshot(user_id)
+            # A concurrent load may have cached totals including the failed write
+            self._invalidate_user_cache(user_id)
+            raise result
+        
+        return result
+    
+    async def _discard_snapshot(self, user_id: str) -> None:
+        """Delete the user's dashboard snapshot so the next load rebuilds it."""
+        try:
+            await self.container.delete_item(item=SNAPSHOT_ID, partition_key=user_id)
+        except exceptions.CosmosResourceNotFoundError:
+            pass
+        except Exception as e:
+            print(f"WARNING: Failed to discard dashboard snapshot: {e}")
+    
+    async def _get_cached(self, user_id: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return a cached query result for a user, loading it at most once at a time.
+        
+        Concurrent callers for the same user and key share a single pending
+        Cosmos DB query instead of each issuing their own. Results are tied to
+        the data version used for ETags, so a write made through another
+        replica can't leave a stale body cached behind a new ETag.
+        
+        Args:
+            user_id: User ID (partition key)
+            key: Cache key for the query within the user's entries
+            loader: Coroutine factory that runs the query
+            
+        Returns:
+            Cached or freshly loaded result
+        """
+        version = await self.get_data_version(user_id)
+        
+        entries = self._result_cache.get(user_id)
+        if entries:
+            cached = entries.get(key)
+            if cached and cached[1] > time.monotonic() and cached[2] == version:
+                self._result_cache.move_to_end(user_id)
+                return cached[0]
+        
+        inflight_key = (user_id, key, version)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._load_and_cache(user_id, key, version, loader))
+            self._inflight[inflight_key] = task
+        
+        # Shield the shared query so one caller disconnecting doesn't cancel it for the others
+        return await asyncio.shield(task)
+    
+    async def _load_and_cache(
+        self,
+        user_id: str,
+        key: str,
+        version: str,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run a query for _get_cached and store its result unless invalidated meanwhile."""
+        inflight_key = (user_id, key, version)
+        task = asyncio.current_task()
+        try:
+            value = await loader()
+        finally:
+            current = self._inflight.get(inflight_key) is task
+            if current:
+                del self._inflight[inflight_key]
+        
+        # A write during the query invalidated it; don't cache a possibly stale result
+        if current:
+            entries = self._result_cache.setdefault(user_id, {})
+            entries[key] = (value, time.monotonic() + RESULT_CACHE_TTL_SECONDS, version)
+            self._result_cache.move_to_end(user_id)
+            if len(self._result_cache) > USER_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        
+        return value
+    
+    def _invalidate_user_cache(self, user_id: str) -> None:
+        """Drop cached data for a user after one of their sales changes."""
+        self._data_versions.pop(user_id, None)
+        self._result_cache.pop(user_id, None)
+        for inflight_key in [k for k in self._inflight if k[0] == user_id]:
+            del self._inflight[inflight_key]
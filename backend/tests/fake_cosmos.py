@@ -0,0 +1,143 @@
+"""
+In-memory stand-in for the async Cosmos DB container, for service tests.
+"""
+import copy
+import re
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from azure.core import MatchConditions
+from azure.cosmos import exceptions
+from app.services.cosmos_service import CosmosService
+
+
+class FakeContainer:
+    """
+    Implements the subset of the async ContainerProxy used by CosmosService.
+    
+    Queries are recognised by their shape rather than parsed, so this only
+    understands the queries CosmosService issues.
+    """
+
+    def __init__(self):
+        self.items: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Optional hook awaited after a query has been evaluated but before its
+        # results are returned, to simulate writes racing a query
+        self.before_results: Optional[Callable[[str], Awaitable[None]]] = None
+        # Errors to raise from the Nth (1-based) execute_item_batch call
+        self.batch_failures: Dict[int, Exception] = {}
+        self.batch_calls = 0
+
+    def _store(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        item = copy.deepcopy(body)
+        item["_etag"] = uuid.uuid4().hex
+        self.items[(item["userId"], item["id"])] = item
+        return copy.deepcopy(item)
+
+    def _get(self, item: str, partition_key: str) -> Dict[str, Any]:
+        if (partition_key, item) not in self.items:
+            raise exceptions.CosmosResourceNotFoundError(status_code=404, message="Not found")
+        return self.items[(partition_key, item)]
+
+    async def read_item(self, item: str, partition_key: str, **kwargs) -> Dict[str, Any]:
+        return copy.deepcopy(self._get(item, partition_key))
+
+    async def create_item(self, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        if (body["userId"], body["id"]) in self.items:
+            raise exceptions.CosmosResourceExistsError(status_code=409, message="Conflict")
+        return self._store(body)
+
+    async def replace_item(
+        self,
+        item: str,
+        body: Dict[str, Any],
+        etag: Optional[str] = None,
+        match_condition: Optional[MatchConditions] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        existing = self._get(item, body["userId"])
+        if match_condition == MatchConditions.IfNotModified and existing["_etag"] != etag:
+            raise exceptions.CosmosAccessConditionFailedError(status_code=412, message="Precondition failed")
+        return self._store(body)
+
+    async def delete_item(self, item: str, partition_key: str, **kwargs) -> None:
+        self._get(item, partition_key)
+        del self.items[(partition_key, item)]
+
+    async def patch_item(
+        self,
+        item: str,
+        partition_key: str,
+        patch_operations: list,
+        filter_predicate: Optional[str] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        existing = self._get(item, partition_key)
+        if filter_predicate:
+            month = re.search(r"c\.month = '([^']*)'", filter_predicate).group(1)
+            if existing.get("month") != month:
+                raise exceptions.CosmosAccessConditionFailedError(status_code=412, message="Precondition failed")
+        patched = copy.deepcopy(existing)
+        for operation in patch_operations:
+            field = operation["path"].lstrip("/")
+            if operation["op"] == "incr":
+                patched[field] = patched.get(field, 0) + operation["value"]
+            else:
+                patched[field] = operation["value"]
+        return self._store(patched)
+
+    async def execute_item_batch(self, batch_operations: list, partition_key: str, **kwargs) -> list:
+        self.batch_calls += 1
+        if self.batch_calls in self.batch_failures:
+            raise self.batch_failures[self.batch_calls]
+        # Batches are all-or-nothing, so check every operation before storing
+        for index, (_, (body,)) in enumerate(batch_operations):
+            if (partition_key, body["id"]) in self.items:
+                raise exceptions.CosmosBatchOperationError(
+                    error_index=index, headers={}, status_code=409, message="Conflict", operation_responses=[]
+                )
+        return [self._store(body) for _, (body,) in batch_operations]
+
+    def query_items(self, query: str, parameters: list, partition_key: str, **kwargs):
+        values = {parameter["name"]: parameter["value"] for parameter in parameters}
+        sales = [
+            item for (user_id, _), item in self.items.items()
+            if user_id == partition_key and "type" not in item
+        ]
+
+        if "SUM(c.amount)" in query:
+            amounts = [sale["amount"] for sale in sales]
+            results = [{
+                "totalSales": sum(amounts) if amounts else None,
+                "totalItems": len(amounts),
+                "avgPrice": sum(amounts) / len(amounts) if amounts else None,
+                "thisMonth": sum(
+                    sale["amount"] for sale in sales
+                    if values["@monthStart"] <= sale["saleDate"] < values["@monthEnd"]
+                )
+            }]
+        elif "MAX(c.updatedAt)" in query:
+            results = [{
+                "lastUpdated": max((sale["updatedAt"] for sale in sales), default=None),
+                "itemCount": len(sales)
+            }]
+        else:
+            results = sorted(sales, key=lambda sale: sale["saleDate"], reverse=True)
+            if "@limit" in values:
+                results = results[:values["@limit"]]
+            results = [{k: v for k, v in sale.items() if not k.startswith("_")} for sale in results]
+
+        return self._results(query, copy.deepcopy(results))
+
+    async def _results(self, query: str, results: list):
+        if self.before_results:
+            await self.before_results(query)
+        for result in results:
+            yield result
+
+
+def make_service(container: FakeContainer) -> CosmosService:
+    """Create a CosmosService that talks to the given fake container."""
+    service = CosmosService()
+    service.client = object()
+    service.container = container
+    return service
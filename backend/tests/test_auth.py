@@ -0,0 +1,75 @@
+"""
+Unit tests for Azure Static Web Apps authentication utilities.
+"""
+import base64
+import json
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from app.auth.swa_auth import get_current_user, get_user_id, get_user_claims
+
+
+def make_request(principal: dict = None, header: str = None) -> Request:
+    """Build a request carrying an x-ms-client-principal header."""
+    if principal is not None:
+        header = base64.b64encode(json.dumps(principal).encode()).decode()
+    headers = [(b"x-ms-client-principal", header.encode())] if header is not None else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_get_current_user():
+    """Test decoding a valid client principal."""
+    request = make_request({
+        "userId": "user123",
+        "userDetails": "octocat",
+        "identityProvider": "github",
+        "claims": [{"typ": "name", "val": "Octocat"}]
+    })
+    user = get_current_user(request)
+    assert user["userId"] == "user123"
+    assert user["userDetails"] == "octocat"
+    assert user["provider"] == "github"
+    assert get_user_id(request) == "user123"
+    assert get_user_claims(request) == [{"typ": "name", "val": "Octocat"}]
+
+
+def test_get_current_user_is_cached_per_request():
+    """Test that the principal is decoded once per request."""
+    request = make_request({"userId": "user123"})
+    assert get_current_user(request) is get_current_user(request)
+
+
+def test_missing_principal_is_unauthorized():
+    """Test that requests without a principal are rejected."""
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user(make_request())
+    assert exc_info.value.status_code == 401
+
+
+def test_malformed_principal_is_unauthorized():
+    """Test that a principal that isn't a JSON object is rejected."""
+    header = base64.b64encode(b'["not", "an", "object"]').decode()
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user(make_request(header=header))
+    assert exc_info.value.status_code == 401
+
+
+def test_get_user_id_without_user_id_is_unauthorized():
+    """Test that the user ID fast path still rejects principals without a userId."""
+    with pytest.raises(HTTPException) as exc_info:
+        get_user_id(make_request({"userDetails": "octocat"}))
+    assert exc_info.value.status_code == 401
+
+
+def test_invalid_base64_is_unauthorized():
+    """Test that a principal that isn't valid base64 is rejected."""
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user(make_request(header="not*base64!"))
+    assert exc_info.value.status_code == 401
+
+
+def test_current_user_excludes_claims():
+    """Test that claims are only parsed through get_user_claims."""
+    request = make_request({"userId": "user123", "claims": [{"typ": "role", "val": "admin"}]})
+    assert "claims" not in get_current_user(request)
+    assert get_user_claims(request) == [{"typ": "role", "val": "admin"}]
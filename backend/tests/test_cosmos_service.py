@@ -0,0 +1,174 @@
+"""
+Unit tests for CosmosService against an in-memory container.
+"""
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from app.models.sales import SaleCreate
+from app.services import cosmos_service
+from tests.fake_cosmos import FakeContainer, make_service
+
+
+def make_sale(amount: float, sale_date: str = None) -> SaleCreate:
+    """Build sale creation data, dated this month unless a date is given."""
+    if sale_date is None:
+        sale_date = datetime.now(timezone.utc).strftime("%Y-%m-15")
+    return SaleCreate(productName="Nike Air Jordan 1", amount=amount, saleDate=sale_date, platform="stockx")
+
+
+@pytest.fixture(autouse=True)
+def cosmos_env(monkeypatch):
+    """Satisfy CosmosService's configuration check."""
+    monkeypatch.setenv("COSMOSDB_CONNECTION_STRING", "AccountEndpoint=https://test.documents.azure.com:443/;")
+
+
+def test_result_cache_follows_writes_from_other_replicas(monkeypatch):
+    """Test that cached stats are dropped once another replica's write changes the data version."""
+    container = FakeContainer()
+    replica_a = make_service(container)
+    replica_b = make_service(container)
+
+    async def scenario():
+        await replica_a.create_sale("user123", make_sale(10.0))
+        assert (await replica_b.get_dashboard_stats("user123")).totalSales == 10.0
+
+        await replica_a.create_sale("user123", make_sale(20.0))
+        # Let replica B's cached data version expire
+        monkeypatch.setattr(cosmos_service, "DATA_VERSION_TTL_SECONDS", 0)
+        return await replica_b.get_dashboard_stats("user123")
+
+    stats = asyncio.run(scenario())
+    assert stats.totalSales == 30.0
+    assert stats.totalItems == 2
+
+
+def snapshot_of(container: FakeContainer, user_id: str = "user123") -> dict:
+    """Return the stored dashboard snapshot document for a user."""
+    return container.items[(user_id, cosmos_service.SNAPSHOT_ID)]
+
+
+def test_snapshot_tracks_creates_and_deletes():
+    """Test that sale writes are applied to the snapshot incrementally."""
+    container = FakeContainer()
+    service = make_service(container)
+
+    async def scenario():
+        await service.create_sale("user123", make_sale(10.0))
+        # First load builds the snapshot from the sales
+        assert (await service.get_dashboard_stats("user123")).totalItems == 1
+
+        second = await service.create_sale("user123", make_sale(20.0))
+        await service.create_sale("user123", make_sale(5.0, "2020-01-15"))
+        await service.delete_sale("user123", second.id)
+        return await service.get_dashboard_stats("user123")
+
+    stats = asyncio.run(scenario())
+    assert stats.totalSales == 15.0
+    assert stats.totalItems == 2
+    assert stats.thisMonth == 10.0
+    assert stats.avgPrice == 7.5
+    assert snapshot_of(container)["totalItems"] == 2
+
+
+def test_snapshot_is_rebuilt_after_month_rollover():
+    """Test that a snapshot from a previous month is discarded and rebuilt."""
+    container = FakeContainer()
+    service = make_service(container)
+
+    async def scenario():
+        await service.create_sale("user123", make_sale(10.0, "2020-01-15"))
+        await service.get_dashboard_stats("user123")
+        # Pretend the snapshot was built last month, with a stale monthly total
+        snapshot_of(container).update(month="2020-01", thisMonth=10.0)
+
+        # The write's month predicate fails, so the snapshot is discarded
+        await service.create_sale("user123", make_sale(20.0))
+        assert ("user123", cosmos_service.SNAPSHOT_ID) not in container.items
+        return await service.get_dashboard_stats("user123")
+
+    stats = asyncio.run(scenario())
+    assert stats.totalSales == 30.0
+    assert stats.thisMonth == 20.0
+    assert snapshot_of(container)["month"] == datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+@pytest.mark.parametrize("existing_snapshot", [False, True])
+def test_snapshot_rebuild_racing_a_write_is_not_saved(existing_snapshot):
+    """Test that totals computed before a concurrent write don't overwrite the snapshot."""
+    container = FakeContainer()
+    writer = make_service(container)
+    reader = make_service(container)
+
+    async def create_during_aggregate(query):
+        if "SUM(c.amount)" in query and container.before_results:
+            container.before_results = None
+            await writer.create_sale("user123", make_sale(20.0))
+
+    async def scenario():
+        await writer.create_sale("user123", make_sale(10.0))
+        if existing_snapshot:
+            await writer.get_dashboard_stats("user123")
+            # Force the next load to rebuild the snapshot
+            snapshot_of(container)["rebuiltAt"] = 0
+
+        container.before_results = create_during_aggregate
+        await reader.get_dashboard_stats("user123")
+        return await make_service(container).get_dashboard_stats("user123")
+
+    stats = asyncio.run(scenario())
+    assert stats.totalSales == 30.0
+    assert stats.totalItems == 2
+    assert snapshot_of(container)["totalItems"] == 2
+
+
+def test_failed_write_keeps_snapshot_when_delta_not_applied():
+    """Test that a failed write doesn't touch a snapshot its update never reached."""
+    container = FakeContainer()
+    service = make_service(container)
+
+    async def failing_write():
+        # Let the snapshot update miss the (not yet built) snapshot first,
+        # then have a concurrent load build it before the write fails
+        await asyncio.sleep(0)
+        await make_service(container).get_dashboard_stats("user123")
+        raise RuntimeError("write failed")
+
+    async def scenario():
+        await service.create_sale("user123", make_sale(10.0))
+        with pytest.raises(RuntimeError):
+            await service._write_with_snapshot_delta(
+                "user123", failing_write(), amount=20.0, items=1, this_month=20.0
+            )
+
+    asyncio.run(scenario())
+    snapshot = snapshot_of(container)
+    assert snapshot["totalSales"] == 10.0
+    assert snapshot["totalItems"] == 1
+
+
+def test_failed_write_discards_snapshot_rebuilt_after_its_delta():
+    """Test that a failed write doesn't undercount a snapshot rebuilt after its update applied."""
+    container = FakeContainer()
+    service = make_service(container)
+
+    async def failing_write():
+        # Let the snapshot update apply first, then have another replica
+        # rebuild the snapshot (without this sale) before the write fails
+        await asyncio.sleep(0)
+        snapshot_of(container)["rebuiltAt"] = 0
+        await make_service(container).get_dashboard_stats("user123")
+        raise RuntimeError("write failed")
+
+    async def scenario():
+        await service.create_sale("user123", make_sale(10.0))
+        await service.get_dashboard_stats("user123")
+        with pytest.raises(RuntimeError):
+            await service._write_with_snapshot_delta(
+                "user123", failing_write(), amount=20.0, items=1, this_month=20.0
+            )
+        return await make_service(container).get_dashboard_stats("user123")
+
+    stats = asyncio.run(scenario())
+    assert stats.totalSales == 10.0
+    assert stats.totalItems == 1
+    assert stats.thisMonth == 10.0
@@ -0,0 +1,120 @@
+"""
+Unit tests for dashboard API endpoints.
+"""
+import asyncio
+import base64
+import json
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.sales import DashboardStats, SaleCreate
+from app.api.dependencies import get_cosmos_service
+from app.services import cosmos_service
+from tests.fake_cosmos import FakeContainer, make_service
+
+client = TestClient(app)
+
+AUTH_HEADERS = {
+    "x-ms-client-principal": base64.b64encode(
+        json.dumps({"userId": "user123", "userDetails": "test", "identityProvider": "github"}).encode()
+    ).decode()
+}
+
+
+class FakeCosmosService:
+    """Stand-in for CosmosService returning fixed dashboard data."""
+
+    async def get_data_version(self, user_id):
+        return "1:2024-01-15T10:30:00Z"
+
+    async def get_dashboard_version(self, user_id):
+        return "2024-01|1:2024-01-15T10:30:00Z"
+
+    async def get_dashboard_stats(self, user_id):
+        return DashboardStats(totalSales=180.0, totalItems=1, thisMonth=0.0, avgPrice=180.0)
+
+
+@pytest.fixture
+def fake_cosmos():
+    """Serve requests from FakeCosmosService instead of Cosmos DB."""
+    app.dependency_overrides[get_cosmos_service] = FakeCosmosService
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Serve requests from a CosmosService backed by an in-memory container."""
+    monkeypatch.setenv("COSMOSDB_CONNECTION_STRING", "AccountEndpoint=https://test.documents.azure.com:443/;")
+    # Don't let cached data versions hide the changes made by the tests
+    monkeypatch.setattr(cosmos_service, "DATA_VERSION_TTL_SECONDS", 0)
+    service = make_service(FakeContainer())
+    app.dependency_overrides[get_cosmos_service] = lambda: service
+    yield service
+    app.dependency_overrides.clear()
+
+
+def create_sale_this_month(service, amount: float) -> None:
+    """Create a sale dated in the current month directly through the service."""
+    sale_date = datetime.now(timezone.utc).strftime("%Y-%m-15")
+    sale = SaleCreate(productName="Nike Air Jordan 1", amount=amount, saleDate=sale_date, platform="stockx")
+    asyncio.run(service.create_sale("user123", sale))
+
+
+def get_stable_etag(path: str) -> str:
+    """Request a path until its ETag stops changing (the first load builds the snapshot)."""
+    etag = None
+    for _ in range(3):
+        headers = {**AUTH_HEADERS, "If-None-Match": etag} if etag else AUTH_HEADERS
+        response = client.get(path, headers=headers)
+        if response.status_code == 304:
+            return etag
+        etag = response.headers["etag"]
+    raise AssertionError(f"ETag for {path} never settled")
+
+
+def test_dashboard_stats_etag(fake_cosmos):
+    """Test that a matching If-None-Match returns 304 without a body."""
+    response = client.get("/api/dashboard/stats", headers=AUTH_HEADERS)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get("/api/dashboard/stats", headers={**AUTH_HEADERS, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+@pytest.mark.parametrize("limit", [-1, 0, 21])
+def test_recent_sales_limit_is_validated(fake_cosmos, limit):
+    """Test that out-of-range limits are rejected before reaching Cosmos DB."""
+    response = client.get(f"/api/dashboard/recent?limit={limit}", headers=AUTH_HEADERS)
+    assert response.status_code == 422
+
+
+def test_dashboard_etag_changes_when_month_rolls_over(service, monkeypatch):
+    """Test that a new month invalidates cached dashboard responses, since thisMonth moves."""
+    create_sale_this_month(service, 100.0)
+    etag = get_stable_etag("/api/dashboard/stats")
+
+    monkeypatch.setattr(cosmos_service, "utc_month", lambda: "2999-01")
+    response = client.get("/api/dashboard/stats", headers={**AUTH_HEADERS, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["thisMonth"] == 0.0
+    assert response.json()["totalSales"] == 100.0
+
+
+def test_dashboard_etag_changes_when_snapshot_is_rebuilt(service):
+    """Test that a snapshot rebuild, which may correct drifted totals, reaches revalidating clients."""
+    create_sale_this_month(service, 100.0)
+    etag = get_stable_etag("/api/dashboard/stats")
+
+    # Let another replica's load rebuild the (now expired) snapshot
+    service.container.items[("user123", cosmos_service.SNAPSHOT_ID)]["rebuiltAt"] = 0
+    asyncio.run(make_service(service.container).get_dashboard_stats("user123"))
+
+    response = client.get("/api/dashboard/stats", headers={**AUTH_HEADERS, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
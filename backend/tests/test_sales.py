@@ -1,12 +1,40 @@
 """
 Unit tests for sales API endpoints.
 """
+import base64
+import json
 import pytest
+from azure.cosmos import exceptions
 from fastapi.testclient import TestClient
 from app.main import app
+from app.api.dependencies import get_cosmos_service
+from app.services import cosmos_service
+from tests.fake_cosmos import FakeContainer, make_service
 
 client = TestClient(app)
 
+AUTH_HEADERS = {
+    "x-ms-client-principal": base64.b64encode(
+        json.dumps({"userId": "user123", "userDetails": "test", "identityProvider": "github"}).encode()
+    ).decode()
+}
+
+
+def sale_payload(index: int) -> dict:
+    """Build a sale creation request body."""
+    return {"productName": f"Sneaker {index}", "amount": 100.0, "saleDate": "2024-01-15", "platform": "stockx"}
+
+
+@pytest.fixture
+def container(monkeypatch):
+    """Serve requests from a CosmosService backed by an in-memory container."""
+    monkeypatch.setenv("COSMOSDB_CONNECTION_STRING", "AccountEndpoint=https://test.documents.azure.com:443/;")
+    container = FakeContainer()
+    service = make_service(container)
+    app.dependency_overrides[get_cosmos_service] = lambda: service
+    yield container
+    app.dependency_overrides.clear()
+
 
 def test_health_check():
     """Test health check endpoint."""
@@ -34,4 +62,45 @@ def test_sales_endpoints_require_auth():
     assert response.status_code == 401
 
 
+def test_bulk_create_sales(container):
+    """Test that bulk create writes every sale across several batches."""
+    response = client.post("/api/sales/bulk", json=[sale_payload(i) for i in range(150)], headers=AUTH_HEADERS)
+    assert response.status_code == 201
+    assert [sale["productName"] for sale in response.json()] == [f"Sneaker {i}" for i in range(150)]
+    assert container.batch_calls == 2
+
+
+def test_bulk_create_stops_at_first_failed_batch(container):
+    """Test that a failed batch stops the bulk create and reports the sales already created."""
+    container.batch_failures[2] = exceptions.CosmosHttpResponseError(status_code=503, message="Service unavailable")
+
+    response = client.post("/api/sales/bulk", json=[sale_payload(i) for i in range(250)], headers=AUTH_HEADERS)
+    assert response.status_code == 500
+    created = response.json()["detail"]["created"]
+    assert [sale["productName"] for sale in created] == [f"Sneaker {i}" for i in range(100)]
+    # The third batch is never attempted
+    assert container.batch_calls == 2
+    assert len(container.items) == 100
+
+
+def test_bulk_create_conflict_returns_400(container):
+    """Test that a batch rejected for its content maps to 400, like single creates."""
+    container.batch_failures[1] = exceptions.CosmosBatchOperationError(
+        error_index=0, headers={}, status_code=409, message="Conflict", operation_responses=[]
+    )
+
+    response = client.post("/api/sales/bulk", json=[sale_payload(0)], headers=AUTH_HEADERS)
+    assert response.status_code == 400
+    assert response.json()["detail"]["created"] == []
+
+
+def test_bulk_create_rejects_oversized_requests(container, monkeypatch):
+    """Test that bulk requests above the size cap are rejected before writing."""
+    monkeypatch.setattr(cosmos_service, "MAX_BULK_SALES", 2)
+
+    response = client.post("/api/sales/bulk", json=[sale_payload(i) for i in range(3)], headers=AUTH_HEADERS)
+    assert response.status_code == 400
+    assert container.batch_calls == 0
+
+
 # Add more tests as needed
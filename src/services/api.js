@@ -129,6 +129,18 @@ class ApiService {
     });
   }
 
+  /**
+   * Create many sales in one request
+   * @param {Array<Object>} salesData - Sale data for each sale to create
+   * @returns {Promise<Array>} Created sales
+   */
+  async createSalesBulk(salesData) {
+    return this.request('/sales/bulk', {
+      method: 'POST',
+      body: JSON.stringify(salesData),
+    });
+  }
+
   /**
    * Get a specific sale by ID
    * @param {string} saleId - Sale ID